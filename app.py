@@ -1,9 +1,11 @@
 import streamlit as st
-import fitz  # PyMuPDF
-import docx
-import re
-import pandas as pd
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+import multiprocessing
+import xlsxwriter
 from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import compliscan_core as core
 
 # Safaricom Green Theme
 safaricom_green = "#00A550"
@@ -34,107 +36,129 @@ with col2:
 with col3:
     osh_risk_file = st.file_uploader("📕 Upload OSH Risk Evaluator", type=["pdf", "docx"])
 
-# Updated required schedules
-key_schedules = [
-    "PRICING",
-    "SCOPE OF WORK",
-    "SERVICE LEVEL AGREEMENT",
-    "CODE OF CONDUCT",
-    "OSH DOCUMENT VERSION",
-    "CODE OF CONDUCT DOCUMENT VERSION"
-]
-
-def extract_text(file):
-    if file.name.endswith(".pdf"):
-        with fitz.open(stream=file.read(), filetype="pdf") as doc:
-            return "\n".join([page.get_text() for page in doc])
-    elif file.name.endswith(".docx"):
-        doc = docx.Document(file)
-        return "\n".join([p.text for p in doc.paragraphs])
-    return ""
-
-def find_osh_version(text):
-    patterns = [
-        r"OSH\s*Version\s*:?\s*([0-9.]+)",
-        r"Version\s*:?\s*([0-9.]+).*OSH",
-        r"Occupational\s+Safety\s+and\s+Health.*Version\s*:?\s*([0-9.]+)"
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            return match.group(1)
-    return "Not Found"
-
-def check_schedules(text):
-    found = [s for s in key_schedules if s.lower() in text.lower()]
-    missing = [s for s in key_schedules if s not in found]
-    return found, missing
-
-def extract_risk_keywords(text):
-    risk = {"HIGH": [], "MEDIUM": [], "LOW": []}
-    for level in risk:
-        matches = re.findall(rf"{level}.*?:\s*(.*?)\n", text, re.IGNORECASE)
-        for match in matches:
-            phrases = re.split(r",|;|\n", match)
-            risk[level].extend([p.strip().lower() for p in phrases if p.strip()])
-    return risk
-
-def classify_risk(text, risk_keywords):
-    text_lower = text.lower()
-    for level in ["HIGH", "MEDIUM", "LOW"]:
-        for phrase in risk_keywords.get(level, []):
-            if phrase in text_lower:
-                return level
-    return "Unknown"
-
+# Workers come from a forkserver, or are spawned where there is none
+# (Windows): forking the threaded Streamlit server directly can deadlock.
+# Either way each worker re-runs this script once in bare mode (see the
+# uploads check below); preloading keeps that start-up cheap
+@st.cache_resource
+def get_extraction_pool():
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        mp_context = multiprocessing.get_context("forkserver")
+        mp_context.set_forkserver_preload(["compliscan_core", "streamlit"])
+    else:
+        mp_context = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(max_workers=core.EXTRACTION_WORKERS, mp_context=mp_context)
+
+# A crashed worker breaks the shared pool for every session, so rebuild
+# it and retry once
+def with_extraction_pool(task):
+    pool = get_extraction_pool()
+    try:
+        return task(pool)
+    except BrokenProcessPool:
+        if get_extraction_pool() is pool:
+            get_extraction_pool.clear()
+        return task(get_extraction_pool())
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def extract_text(name, digest, _data):
+    return with_extraction_pool(lambda pool: core.extract_text(name, _data, pool))
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def find_reference_version(name, digest, _data):
+    return with_extraction_pool(lambda pool: pool.submit(core.find_osh_version_bytes, name, _data).result())
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def get_automaton(risk_digest, _risk_keywords):
+    return core.build_automaton(_risk_keywords)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def analyze_text(digest, risk_digest, _text, _automaton):
+    return core.analyze(_text, _automaton)
+
+def show_preview(key):
+    st.session_state[key] = True
+
+# Extraction workers import this script as __mp_main__, where the
+# uploaders return None. Keep all work below this check so they skip it
 if contract_files and osh_version_file and osh_risk_file:
     st.success("✅ Files uploaded. Analyzing...")
 
-    version_text = extract_text(osh_version_file)
-    current_osh_version = find_osh_version(version_text)
-    st.info(f"📘 OSH Version Detected: `{current_osh_version}`")
-
-    risk_text = extract_text(osh_risk_file)
-    risk_keywords = extract_risk_keywords(risk_text)
-    st.info("📕 Extracted Risk Keywords:")
-    for level in risk_keywords:
-        st.markdown(f"**{level}**: {', '.join(risk_keywords[level]) or 'None found'}")
+    # Streamlit file objects and widgets stay on the script thread
+    version_data = osh_version_file.getvalue()
+    risk_data = osh_risk_file.getvalue()
+    risk_digest = core.content_digest(risk_data)
+    names = [file.name for file in contract_files]
+    datas = [file.getvalue() for file in contract_files]
+    digests = [core.content_digest(data) for data in datas]
+
+    def analyze_contract(name, digest, text_future):
+        contract_text = text_future.result()
+        analysis = analyze_text(digest, risk_digest, contract_text, automaton)
+        return {
+            "name": name,
+            "compliance": "✅ Compliant" if analysis["version"] == current_osh_version else "❌ Not Compliant",
+            **analysis,
+        }
+
+    # Reference documents and contracts are all extracted up front, so
+    # contract parsing overlaps with reading the references
+    with ThreadPoolExecutor(
+        max_workers=min(8, len(names) + 2),
+        initializer=add_script_run_ctx,
+        initargs=(None, get_script_run_ctx()),
+    ) as executor:
+        version_future = executor.submit(find_reference_version, osh_version_file.name, core.content_digest(version_data), version_data)
+        risk_future = executor.submit(extract_text, osh_risk_file.name, risk_digest, risk_data)
+        text_futures = [executor.submit(extract_text, *upload) for upload in zip(names, digests, datas)]
+
+        current_osh_version = version_future.result()
+        st.info(f"📘 OSH Version Detected: `{current_osh_version}`")
+
+        risk_keywords = core.extract_risk_keywords(risk_future.result())
+        automaton = get_automaton(risk_digest, risk_keywords)
+        st.info("📕 Extracted Risk Keywords:")
+        for level in risk_keywords:
+            st.markdown(f"**{level}**: {', '.join(risk_keywords[level]) or 'None found'}")
+
+        analyses = list(executor.map(analyze_contract, names, digests, text_futures))
 
     results = []
 
-    for file in contract_files:
-        contract_text = extract_text(file)
-        contract_version = find_osh_version(contract_text)
-        compliance = "✅ Compliant" if contract_version == current_osh_version else "❌ Not Compliant"
-        risk = classify_risk(contract_text, risk_keywords)
-        found_schedules, missing_schedules = check_schedules(contract_text)
-
+    for i, analysis in enumerate(analyses):
         results.append({
-            "Contract Name": file.name,
-            "OSH Version": contract_version,
-            "Compliance": compliance,
-            "Risk Level": risk,
-            "Schedules Found": ", ".join(found_schedules),
-            "Missing Schedules": ", ".join(missing_schedules) if missing_schedules else "None"
+            "Contract Name": analysis["name"],
+            "OSH Version": analysis["version"],
+            "Compliance": analysis["compliance"],
+            "Risk Level": analysis["risk"],
+            "Schedules Found": ", ".join(analysis["found"]),
+            "Missing Schedules": ", ".join(analysis["missing"]) if analysis["missing"] else "None"
         })
 
-        with st.expander(f"📄 {file.name}"):
-            st.markdown(f"**OSH Version Detected:** `{contract_version}`")
-            st.markdown(f"**Compliance Status:** {compliance}")
-            st.markdown(f"**Risk Classification:** `{risk}`")
-            st.markdown(f"**Schedules Found:** {', '.join(found_schedules) if found_schedules else 'None'}")
-            if missing_schedules:
-                st.warning(f"⚠️ Missing schedules: {', '.join(missing_schedules)}")
-            st.text_area("📑 Contract Preview", contract_text[:1500], height=200)
+        with st.expander(f"📄 {analysis['name']}"):
+            st.markdown(f"**OSH Version Detected:** `{analysis['version']}`")
+            st.markdown(f"**Compliance Status:** {analysis['compliance']}")
+            st.markdown(f"**Risk Classification:** `{analysis['risk']}`")
+            st.markdown(f"**Schedules Found:** {', '.join(analysis['found']) if analysis['found'] else 'None'}")
+            if analysis["missing"]:
+                st.warning(f"⚠️ Missing schedules: {', '.join(analysis['missing'])}")
+            preview_key = f"preview_{i}_{analysis['name']}"
+            if st.session_state.get(preview_key):
+                st.markdown("**📑 Contract Preview**")
+                st.code(analysis["preview"], language=None)
+            else:
+                st.button("📑 Load Preview", key=f"load_{preview_key}", on_click=show_preview, args=(preview_key,))
 
     st.subheader("📋 Compliance Summary")
-    df = pd.DataFrame(results)
-    st.dataframe(df)
+    st.dataframe(results)
 
     buffer = BytesIO()
-    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="Contract Analysis")
-        writer.close()
+    workbook = xlsxwriter.Workbook(buffer, {"constant_memory": True})
+    worksheet = workbook.add_worksheet("Contract Analysis")
+    worksheet.write_row(0, 0, list(results[0]), workbook.add_format({"bold": True}))
+    for row, result in enumerate(results, start=1):
+        worksheet.write_row(row, 0, list(result.values()))
+    workbook.close()
 
     st.download_button(
         "📥 Download Excel Report",
@@ -0,0 +1,171 @@
+import os
+import re
+import hashlib
+import ahocorasick
+import fitz  # PyMuPDF
+import docx
+from docx.oxml.ns import qn
+from io import BytesIO
+
+# Updated required schedules
+key_schedules = [
+    "PRICING",
+    "SCOPE OF WORK",
+    "SERVICE LEVEL AGREEMENT",
+    "CODE OF CONDUCT",
+    "OSH DOCUMENT VERSION",
+    "CODE OF CONDUCT DOCUMENT VERSION"
+]
+_SCHEDULES_LOWER = tuple(s.lower() for s in key_schedules)
+
+# Expand ligatures so "ﬁ"/"ﬂ" glyphs match plain-text keywords
+_PDF_TEXT_FLAGS = fitz.TEXTFLAGS_TEXT & ~fitz.TEXT_PRESERVE_LIGATURES
+
+_W_P = qn("w:p")
+
+# Size of the extraction pool. A PDF longer than PAGES_PER_TASK pages is
+# split into at most one further page range per worker. Every range task
+# gets its own copy of the file, so together they copy at most
+# PDF_SPLIT_BYTES
+EXTRACTION_WORKERS = min(8, os.cpu_count() or 1)
+PAGES_PER_TASK = 32
+PDF_SPLIT_BYTES = 64 * 1024 * 1024
+
+# Each form is searched over the whole document before the next, so an
+# explicit "OSH Version" label wins over the looser forms anywhere
+_OSH_VERSION_RES = (
+    re.compile(r"OSH\s*Version\s*[:\-]?\s*([0-9.]+)", re.IGNORECASE),
+    re.compile(r"Version\s*[:\-]?\s*([0-9.]+)[^\n]{0,200}?OSH", re.IGNORECASE),
+    re.compile(r"Occupational\s+Safety\s+and\s+Health[^\n]{0,200}?Version\s*[:\-]?\s*([0-9.]+)", re.IGNORECASE),
+)
+# Page text carried over so a version string split across pages still matches
+_OSH_PAGE_OVERLAP = 1000
+_RISK_LEVELS = ("HIGH", "MEDIUM", "LOW")
+# Only newline-terminated lines with a colon can carry a risk list
+_RISK_LINE_RE = re.compile(r"^[^\n]*:[^\n]*(?=\n)", re.MULTILINE)
+# A phrase runs between separators, trimmed of surrounding whitespace
+_RISK_PHRASE_RE = re.compile(r"[^,;\s](?:[^,;\n]*[^,;\s])?")
+
+def content_digest(data):
+    return hashlib.blake2b(data).hexdigest()
+
+def _pdf_text(doc, start, stop):
+    pages = [None] * (stop - start)
+    for i in range(start, stop):
+        pages[i - start] = doc[i].get_text("text", flags=_PDF_TEXT_FLAGS)
+    return "\n".join(pages)
+
+def extract_pdf_pages(data, start=0, stop=None):
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return _pdf_text(doc, start, doc.page_count if stop is None else stop)
+
+# The first range also reports the page count, so the rest of the split
+# needs no separate round trip
+def extract_pdf_head(data):
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return doc.page_count, _pdf_text(doc, 0, min(PAGES_PER_TASK, doc.page_count))
+
+def extract_text_bytes(name, data):
+    if name.endswith(".pdf"):
+        return extract_pdf_pages(data)
+    elif name.endswith(".docx"):
+        doc = docx.Document(BytesIO(data))
+        # CT_P.text is what Paragraph.text returns (tabs and breaks become
+        # \t and \n), without building the Paragraph wrappers
+        return "\n".join(p.text for p in doc.element.body.iter(_W_P))
+    return ""
+
+# MuPDF is not thread-safe, so parsing runs on a process pool
+def extract_text(name, data, pool):
+    if name.endswith(".pdf"):
+        page_count, head = pool.submit(extract_pdf_head, data).result()
+        rest = page_count - PAGES_PER_TASK
+        if rest <= 0:
+            return head
+        parts = min(EXTRACTION_WORKERS, -(-rest // PAGES_PER_TASK), max(1, PDF_SPLIT_BYTES // len(data)))
+        bounds = [PAGES_PER_TASK + part * rest // parts for part in range(parts + 1)]
+        futures = [pool.submit(extract_pdf_pages, data, start, stop) for start, stop in zip(bounds, bounds[1:])]
+        return "\n".join([head] + [f.result() for f in futures])
+    return pool.submit(extract_text_bytes, name, data).result()
+
+def find_osh_version(text):
+    for pattern in _OSH_VERSION_RES:
+        match = pattern.search(text)
+        if match:
+            return match.group(1)
+    return "Not Found"
+
+# The version reference is only searched for its version, so PDFs are
+# read page by page and closed at the first labelled match
+def find_osh_version_bytes(name, data):
+    if name.endswith(".pdf"):
+        labelled, *looser = _OSH_VERSION_RES
+        fallbacks = [None] * len(looser)
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            tail = ""
+            for page in doc:
+                window = tail + "\n" + page.get_text("text", flags=_PDF_TEXT_FLAGS)
+                match = labelled.search(window)
+                if match:
+                    return match.group(1)
+                for i, pattern in enumerate(looser):
+                    if fallbacks[i] is None:
+                        fallbacks[i] = pattern.search(window)
+                tail = window[-_OSH_PAGE_OVERLAP:]
+        for match in fallbacks:
+            if match:
+                return match.group(1)
+        return "Not Found"
+    return find_osh_version(extract_text_bytes(name, data))
+
+def extract_risk_keywords(text):
+    risk = {"HIGH": [], "MEDIUM": [], "LOW": []}
+    text_lower = text.lower()
+    for line in _RISK_LINE_RE.findall(text_lower):
+        # Every level named before a colon takes the phrases after the
+        # first colon that follows it, including a level inside a word
+        for level in risk:
+            start = line.find(level.lower())
+            if start >= 0:
+                colon = line.find(":", start + len(level))
+                if colon >= 0:
+                    risk[level].extend(_RISK_PHRASE_RE.findall(line, colon + 1))
+    return risk
+
+def build_automaton(risk_keywords):
+    automaton = ahocorasick.Automaton()
+
+    def add(word, payload):
+        automaton.add_word(word, automaton.get(word, ()) + (payload,))
+
+    for s, s_lower in zip(key_schedules, _SCHEDULES_LOWER):
+        add(s_lower, ("sched", s))
+    for priority, level in enumerate(_RISK_LEVELS):
+        for phrase in risk_keywords.get(level, []):
+            add(phrase, ("risk", priority))
+    automaton.make_automaton()
+    return automaton
+
+def scan(text_lower, automaton):
+    found = set()
+    best = len(_RISK_LEVELS)
+    for _, payloads in automaton.iter(text_lower):
+        for kind, val in payloads:
+            if kind == "sched":
+                found.add(val)
+            elif val < best:
+                best = val
+        # Schedules usually sit near the front; stop once nothing can change
+        if best == 0 and len(found) == len(key_schedules):
+            break
+    return found, _RISK_LEVELS[best] if best < len(_RISK_LEVELS) else "Unknown"
+
+def analyze(text, automaton):
+    schedules, risk = scan(text.lower(), automaton)
+    return {
+        "version": find_osh_version(text),
+        "risk": risk,
+        "found": [s for s in key_schedules if s in schedules],
+        "missing": [s for s in key_schedules if s not in schedules],
+        "preview": text[:1500],
+    }
@@ -0,0 +1,149 @@
+import docx
+import fitz  # PyMuPDF
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+
+import compliscan_core as core
+
+
+def make_pdf(*pages):
+    doc = fitz.open()
+    for lines in pages:
+        page = doc.new_page()
+        for i, line in enumerate(lines):
+            page.insert_text((72, 72 + 14 * i), line)
+    return doc.tobytes()
+
+
+def test_find_osh_version_prefers_labelled_version():
+    assert core.find_osh_version("Contract Version 1.0 - includes OSH annex\nOSH Version: 3.2") == "3.2"
+    assert core.find_osh_version("Template version: 7 (OSH schedule)\n...\nOSH Version 2.0") == "2.0"
+
+
+def test_find_osh_version_falls_back_to_looser_forms():
+    assert core.find_osh_version("Version 1.0 of the OSH document") == "1.0"
+    assert core.find_osh_version("Occupational Safety and Health Policy Version: 4.2") == "4.2"
+    assert core.find_osh_version("no version here") == "Not Found"
+
+
+def test_find_osh_version_bytes_prefers_labelled_version_on_later_page():
+    data = make_pdf(["Contract Version 1.0 - includes OSH annex"], ["OSH Version: 3.2"])
+    assert core.find_osh_version_bytes("ref.pdf", data) == "3.2"
+
+
+def test_find_osh_version_bytes_uses_first_fallback_match():
+    data = make_pdf(["Template version: 7 (OSH schedule)"], ["Version 9 of the OSH pack"])
+    assert core.find_osh_version_bytes("ref.pdf", data) == "7"
+
+
+def test_find_osh_version_tries_looser_forms_in_order():
+    text = "Occupational Safety and Health Version: 4.2\nVersion 1.0 OSH"
+    assert core.find_osh_version(text) == "1.0"
+
+
+def test_find_osh_version_bytes_tries_looser_forms_in_order():
+    data = make_pdf(["Occupational Safety and Health Version: 4.2"], ["Version 1.0 OSH"])
+    assert core.find_osh_version_bytes("ref.pdf", data) == "1.0"
+
+
+def make_docx(*paragraph_xml):
+    doc = docx.Document()
+    for xml in paragraph_xml:
+        doc.element.body.append(parse_xml(f"<w:p {nsdecls('w')}>{xml}</w:p>"))
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def test_extract_docx_keeps_tabs_and_breaks():
+    data = make_docx(
+        "<w:r><w:t>OSH Version:</w:t><w:tab/><w:t>3.0</w:t></w:r>",
+        "<w:r><w:t>SERVICE LEVEL</w:t><w:tab/><w:t>AGREEMENT</w:t></w:r>",
+        "<w:r><w:t>HIGH: working at height</w:t><w:br/><w:t>MEDIUM: noise</w:t><w:cr/></w:r>",
+    )
+    text = core.extract_text_bytes("contract.docx", data)
+    assert "OSH Version:\t3.0" in text
+    assert "SERVICE LEVEL\tAGREEMENT" in text
+    assert core.find_osh_version(text) == "3.0"
+    assert core.extract_risk_keywords(text)["MEDIUM"] == ["noise"]
+    assert core.extract_risk_keywords(text)["HIGH"] == ["working at height"]
+
+
+def test_risk_level_inside_another_label_keeps_its_phrases():
+    text = "Below-ground work - HIGH: excavation, confined space\n"
+    risk = core.extract_risk_keywords(text)
+    assert risk["HIGH"] == ["excavation", "confined space"]
+    # The "low" in "Below" names a level too, as it always has
+    assert risk["LOW"] == ["excavation", "confined space"]
+    automaton = core.build_automaton(risk)
+    assert core.scan(text.lower(), automaton)[1] == "HIGH"
+
+
+def test_empty_risk_line_does_not_swallow_the_next_level():
+    risk = core.extract_risk_keywords("HIGH:\nMEDIUM: noise, dust\n")
+    assert risk["HIGH"] == []
+    assert risk["MEDIUM"] == ["noise", "dust"]
+
+
+def test_risk_phrases_follow_the_first_colon_after_the_level():
+    text = "Notes: low-risk: gloves; boots\nHigh risk tasks: hot work: welding\nmedium: unterminated"
+    assert core.extract_risk_keywords(text) == {
+        "HIGH": ["hot work: welding"],
+        "MEDIUM": [],
+        "LOW": ["gloves", "boots"],
+    }
+
+
+def test_shared_phrase_keeps_every_payload():
+    automaton = core.build_automaton({"HIGH": [], "MEDIUM": ["pricing"], "LOW": ["pricing"]})
+    assert automaton.get("pricing") == (("sched", "PRICING"), ("risk", 1), ("risk", 2))
+    assert core.scan("pricing", automaton) == ({"PRICING"}, "MEDIUM")
+
+
+def test_scan_reports_lowest_match_or_unknown():
+    automaton = core.build_automaton({"HIGH": ["fire"], "MEDIUM": ["noise"], "LOW": ["paper"]})
+    assert core.scan("paper only", automaton)[1] == "LOW"
+    assert core.scan("nothing to see", automaton) == (set(), "Unknown")
+
+
+def test_scan_stops_early_only_when_nothing_can_change():
+    automaton = core.build_automaton({"HIGH": ["fire"], "MEDIUM": ["noise"], "LOW": []})
+    schedules = " ".join(s.lower() for s in core.key_schedules)
+    # HIGH comes first, but the schedules after it must still be found
+    assert core.scan("fire " + schedules, automaton) == (set(core.key_schedules), "HIGH")
+    # Every schedule comes first, but a later HIGH must still win
+    assert core.scan(schedules + " noise fire", automaton) == (set(core.key_schedules), "HIGH")
+
+
+def test_scan_finds_schedule_inside_longer_schedule():
+    automaton = core.build_automaton({})
+    found, _ = core.scan("code of conduct document version", automaton)
+    assert found == {"CODE OF CONDUCT", "CODE OF CONDUCT DOCUMENT VERSION"}
+
+
+class CountingPool(ProcessPoolExecutor):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.submitted = 0
+
+    def submit(self, *args, **kwargs):
+        self.submitted += 1
+        return super().submit(*args, **kwargs)
+
+
+def test_extract_text_splits_long_pdf_by_page_count(monkeypatch):
+    monkeypatch.setattr(core, "EXTRACTION_WORKERS", 4)
+    data = make_pdf(*[[f"page {i}"] for i in range(100)])
+    with CountingPool(max_workers=2) as pool:
+        assert core.extract_text("contract.pdf", data, pool) == core.extract_text_bytes("contract.pdf", data)
+    # The head task, then ceil(68 / 32) ranges for the remaining pages
+    assert pool.submitted == 1 + 3
+
+
+def test_extract_text_keeps_short_pdf_in_one_task():
+    data = make_pdf(*[[f"page {i}"] for i in range(core.PAGES_PER_TASK)])
+    with CountingPool(max_workers=2) as pool:
+        assert core.extract_text("contract.pdf", data, pool) == core.extract_text_bytes("contract.pdf", data)
+    assert pool.submitted == 1